@@ -6,97 +6,149 @@ Usage:
     python3 scripts/benchmark_report.py [--compare-dbs] [--zerodb-only]
 """
 
-import json
 import os
 import sys
 import argparse
+import functools
+import io
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import subprocess
 
+try:
+    from orjson import loads as json_loads
+except ImportError:  # orjson is optional; the stdlib parser also accepts bytes
+    from json import loads as json_loads
+
+def _load_estimates(path: str) -> Dict:
+    """Load a single criterion estimates.json file."""
+    with open(path, 'rb') as f:
+        return json_loads(f.read())
+
+def _buffered_output(method):
+    """Collect a report in memory and write it to stdout in one call."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            sys.stdout.write(self._out.getvalue())
+            self._out = io.StringIO()
+    return wrapper
+
 class BenchmarkReport:
     def __init__(self, base_dir: Path):
         self.base_dir = base_dir
         self.criterion_dir = base_dir / "target" / "criterion"
+        self._parsed: Dict[str, Dict] = {}
+        self._estimate_files: Optional[Dict[str, List[Tuple[str, str]]]] = None
+        self._out = io.StringIO()
+        
+    def _scan_criterion_dir(self) -> Dict[str, List[Tuple[str, str]]]:
+        """Index the estimates.json files of every benchmark in one walk."""
+        if self._estimate_files is not None:
+            return self._estimate_files
+            
+        self._estimate_files = {}
+        if not self.criterion_dir.exists():
+            return self._estimate_files
+            
+        with os.scandir(self.criterion_dir) as benches:
+            for bench in benches:
+                if not bench.is_dir():
+                    continue
+                files = []
+                with os.scandir(bench.path) as entries:
+                    for entry in entries:
+                        if entry.is_dir() and not entry.name.startswith('.'):
+                            estimates_file = os.path.join(entry.path, "base", "estimates.json")
+                            if os.path.exists(estimates_file):
+                                files.append((entry.name, estimates_file))
+                self._estimate_files[bench.name] = files
+        
+        return self._estimate_files
         
     def parse_criterion_data(self, bench_name: str) -> Dict:
-        """Parse criterion benchmark results."""
+        """Parse criterion benchmark results (cached per bench_name)."""
+        if bench_name in self._parsed:
+            return self._parsed[bench_name]
+            
         results = {}
-        bench_dir = self.criterion_dir / bench_name
+        estimate_files = self._scan_criterion_dir().get(bench_name)
         
-        if not bench_dir.exists():
+        if estimate_files is None:
             return results
             
-        for test_dir in bench_dir.iterdir():
-            if test_dir.is_dir() and not test_dir.name.startswith('.'):
-                estimates_file = test_dir / "base" / "estimates.json"
-                if estimates_file.exists():
-                    with open(estimates_file) as f:
-                        data = json.load(f)
-                        results[test_dir.name] = {
-                            'mean': data['mean']['point_estimate'] / 1e9,  # Convert to seconds
-                            'std_dev': data['std_dev']['point_estimate'] / 1e9,
-                        }
-        
+        test_names = [test_name for test_name, _ in estimate_files]
+        paths = [path for _, path in estimate_files]
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            for test_name, data in zip(test_names, executor.map(_load_estimates, paths)):
+                results[test_name] = {
+                    'mean': data['mean']['point_estimate'] / 1e9,  # Convert to seconds
+                    'std_dev': data['std_dev']['point_estimate'] / 1e9,
+                }
+        
+        self._parsed[bench_name] = results
         return results
 
+    @_buffered_output
     def generate_database_comparison_report(self):
         """Generate report comparing different databases."""
-        print("# Database Comparison Report")
-        print(f"\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        self._emit("# Database Comparison Report")
+        self._emit(f"\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
         
         # Parse all benchmark results
         results = self.parse_criterion_data("database_comparison")
         
         if not results:
-            print("No benchmark results found. Run benchmarks first:")
-            print("  cargo bench --bench database_comparison")
+            self._emit("No benchmark results found. Run benchmarks first:")
+            self._emit("  cargo bench --bench database_comparison")
             return
         
         # Organize results by operation type
-        operations = {}
+        operations = defaultdict(dict)
         for test_name, data in results.items():
-            parts = test_name.split('/')
+            parts = test_name.split('/', 2)
             if len(parts) >= 2:
                 db_name = parts[0]
                 op_type = parts[1]
-                
-                if op_type not in operations:
-                    operations[op_type] = {}
                 operations[op_type][db_name] = data
         
         # Generate comparison tables
-        print("## Sequential Write Performance\n")
+        self._emit("## Sequential Write Performance\n")
         self._print_comparison_table(operations.get('sequential_writes', {}))
         
-        print("\n## Random Write Performance\n")
+        self._emit("\n## Random Write Performance\n")
         self._print_comparison_table(operations.get('random_writes', {}))
         
-        print("\n## Read Performance\n")
+        self._emit("\n## Read Performance\n")
         self._print_comparison_table(operations.get('random_reads', {}))
         
-        print("\n## Concurrent Read Performance\n")
+        self._emit("\n## Concurrent Read Performance\n")
         self._print_comparison_table(operations.get('concurrent_reads', {}))
         
-        print("\n## Full Scan Performance\n")
+        self._emit("\n## Full Scan Performance\n")
         self._print_comparison_table(operations.get('full_scan', {}))
         
-        print("\n## Mixed Workload Performance\n")
+        self._emit("\n## Mixed Workload Performance\n")
         self._print_comparison_table(operations.get('mixed_workload', {}))
         
         # Generate summary
         self._generate_summary(operations)
         
+    @_buffered_output
     def generate_zerodb_performance_report(self):
         """Generate detailed ZeroDB performance report."""
-        print("# ZeroDB Performance Report")
-        print(f"\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        self._emit("# ZeroDB Performance Report")
+        self._emit(f"\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
         
         # Get version info
         try:
-            git_hash = subprocess.check_output(['git', 'rev-parse', 'HEAD']).decode().strip()[:8]
-            print(f"Git commit: {git_hash}")
+            git_hash = self._git_commit_hash()
+            self._emit(f"Git commit: {git_hash}")
         except:
             pass
             
@@ -104,8 +156,8 @@ class BenchmarkReport:
         results = self.parse_criterion_data("zerodb_performance")
         
         if not results:
-            print("No benchmark results found. Run benchmarks first:")
-            print("  cargo bench --bench zerodb_performance")
+            self._emit("No benchmark results found. Run benchmarks first:")
+            self._emit("  cargo bench --bench zerodb_performance")
             return
         
         # Group by categories
@@ -121,19 +173,21 @@ class BenchmarkReport:
             'special_patterns': []
         }
         
+        # Category names have distinct leading tokens, so one lookup finds the candidate
+        by_prefix = {category.split('_', 1)[0]: category for category in categories}
         for test_name, data in results.items():
-            for category in categories:
-                if test_name.startswith(category):
-                    categories[category].append((test_name, data))
+            category = by_prefix.get(test_name.split('_', 1)[0])
+            if category and test_name.startswith(category):
+                categories[category].append((test_name, data))
         
         # Generate detailed reports for each category
         for category, tests in categories.items():
             if tests:
-                print(f"\n## {category.replace('_', ' ').title()}\n")
+                self._emit(f"\n## {category.replace('_', ' ').title()}\n")
                 for test_name, data in sorted(tests):
                     ops_per_sec = 1.0 / data['mean'] if data['mean'] > 0 else 0
-                    print(f"- **{test_name}**: {self._format_throughput(ops_per_sec)} "
-                          f"(±{data['std_dev']*1000:.2f}ms)")
+                    self._emit(f"- **{test_name}**: {self._format_throughput(ops_per_sec)} "
+                                f"(±{data['std_dev']*1000:.2f}ms)")
         
         # Performance trends
         self._generate_performance_trends(results)
@@ -141,26 +195,46 @@ class BenchmarkReport:
         # Regression detection
         self._check_regressions(results)
         
+    def _git_commit_hash(self) -> str:
+        """Read the short HEAD hash from .git, falling back to git rev-parse."""
+        git_dir = self.base_dir / ".git"
+        try:
+            head = (git_dir / "HEAD").read_text().strip()
+            if head.startswith('ref: '):
+                head = (git_dir / head[5:]).read_text().strip()
+            return head[:8]
+        except OSError:
+            # Worktrees (.git is a file) and packed refs need git itself
+            return subprocess.check_output(['git', 'rev-parse', 'HEAD']).decode().strip()[:8]
+        
     def _print_comparison_table(self, data: Dict):
         """Print a comparison table for databases."""
         if not data:
-            print("No data available")
+            self._emit("No data available")
             return
             
-        databases = sorted(set(db for test_data in data.values() for db in test_data))
-        
-        print("| Test | " + " | ".join(databases) + " |")
-        print("|------|" + "|".join(["------" for _ in databases]) + "|")
-        
-        for test in sorted(data.keys()):
-            row = [test]
-            for db in databases:
-                if db in data[test]:
-                    ops_per_sec = 1.0 / data[test][db]['mean'] if data[test][db]['mean'] > 0 else 0
-                    row.append(self._format_throughput(ops_per_sec))
-                else:
-                    row.append("N/A")
-            print("| " + " | ".join(row) + " |")
+        databases = sorted({db for test_data in data.values() for db in test_data})
+        
+        lines = [
+            "| Test | " + " | ".join(databases) + " |",
+            "|------|" + "|".join(["------" for _ in databases]) + "|",
+        ]
+        
+        format_throughput = self._format_throughput
+        for test in sorted(data):
+            cells = [
+                "N/A" if stats is None
+                else format_throughput(1.0 / stats['mean'] if stats['mean'] > 0 else 0)
+                for stats in map(data[test].get, databases)
+            ]
+            lines.append("| " + " | ".join([test, *cells]) + " |")
+        
+        self._out.write("\n".join(lines) + "\n")
+    
+    def _emit(self, text: str = ""):
+        """Append a line to the pending report output."""
+        self._out.write(text)
+        self._out.write("\n")
     
     def _format_throughput(self, ops_per_sec: float) -> str:
         """Format throughput numbers."""
@@ -173,10 +247,10 @@ class BenchmarkReport:
     
     def _generate_summary(self, operations: Dict):
         """Generate overall summary and recommendations."""
-        print("\n## Summary\n")
+        self._emit("\n## Summary\n")
         
         # Calculate relative performance
-        print("### Relative Performance (vs LMDB)\n")
+        self._emit("### Relative Performance (vs LMDB)\n")
         
         for op_type, data in operations.items():
             if 'lmdb' in data and 'zerodb' in data:
@@ -184,36 +258,36 @@ class BenchmarkReport:
                 zerodb_perf = 1.0 / data['zerodb']['mean']
                 ratio = zerodb_perf / lmdb_perf
                 
-                print(f"- **{op_type}**: ZeroDB is {ratio:.2f}x "
-                      f"{'faster' if ratio > 1 else 'slower'} than LMDB")
+                self._emit(f"- **{op_type}**: ZeroDB is {ratio:.2f}x "
+                            f"{'faster' if ratio > 1 else 'slower'} than LMDB")
         
-        print("\n### Recommendations\n")
-        print("- **Use ZeroDB when**: Sequential write performance is critical")
-        print("- **Use LMDB when**: Random write performance is needed")
-        print("- **Use RocksDB when**: Compression is required")
-        print("- **Use redb when**: Pure Rust is mandatory")
+        self._emit("\n### Recommendations\n")
+        self._emit("- **Use ZeroDB when**: Sequential write performance is critical")
+        self._emit("- **Use LMDB when**: Random write performance is needed")
+        self._emit("- **Use RocksDB when**: Compression is required")
+        self._emit("- **Use redb when**: Pure Rust is mandatory")
         
     def _generate_performance_trends(self, results: Dict):
         """Analyze performance trends."""
-        print("\n## Performance Characteristics\n")
+        self._emit("\n## Performance Characteristics\n")
         
         # Analyze value size impact
         overflow_tests = [(k, v) for k, v in results.items() if 'overflow' in k]
         if overflow_tests:
-            print("### Value Size Impact")
+            self._emit("### Value Size Impact")
             for test, data in sorted(overflow_tests):
-                print(f"- {test}: {data['mean']*1000:.2f}ms per operation")
+                self._emit(f"- {test}: {data['mean']*1000:.2f}ms per operation")
         
         # Analyze concurrency scalability
         concurrent_tests = [(k, v) for k, v in results.items() if 'concurrent' in k]
         if concurrent_tests:
-            print("\n### Concurrency Scalability")
+            self._emit("\n### Concurrency Scalability")
             for test, data in sorted(concurrent_tests):
-                print(f"- {test}: {data['mean']*1000:.2f}ms")
+                self._emit(f"- {test}: {data['mean']*1000:.2f}ms")
     
     def _check_regressions(self, results: Dict):
         """Check for performance regressions."""
-        print("\n## Regression Check\n")
+        self._emit("\n## Regression Check\n")
         
         # Define thresholds
         thresholds = {
@@ -230,11 +304,11 @@ class BenchmarkReport:
                                      f"(threshold: {threshold*1000:.2f}ms)")
         
         if regressions:
-            print("⚠️ **Performance Regressions Detected:**")
+            self._emit("⚠️ **Performance Regressions Detected:**")
             for r in regressions:
-                print(r)
+                self._emit(r)
         else:
-            print("✅ No performance regressions detected")
+            self._emit("✅ No performance regressions detected")
 
 def main():
     parser = argparse.ArgumentParser(description='Generate benchmark reports')
@@ -4,41 +4,62 @@ Compare benchmark results between the base branch and current PR.
 Generates a markdown comment for the PR with performance comparisons.
 """
 
-import json
+import bisect
 import os
 import sys
 import subprocess
 from typing import Dict, List, Tuple
 
+try:
+    from orjson import loads as json_loads
+except ImportError:  # orjson is optional
+    from json import loads as json_loads
+
 def parse_criterion_output(json_file: str) -> Dict[str, float]:
     """Parse criterion JSON output and extract benchmark results."""
     results = {}
     try:
-        with open(json_file, 'r') as f:
-            for line in f:
-                try:
-                    data = json.loads(line)
-                    if data.get('reason') == 'benchmark-complete':
-                        bench_id = data['id']
-                        # Extract median time in nanoseconds
-                        median = data['median']['point_estimate']
-                        results[bench_id] = median
-                except json.JSONDecodeError:
-                    continue
+        with open(json_file, 'rb') as f:
+            data = f.read()
     except FileNotFoundError:
         print(f"Warning: {json_file} not found")
+        return results
+    
+    # Criterion emits one JSON object per line; decode them all in one call
+    lines = [line.strip() for line in data.split(b'\n')]
+    lines = [line for line in lines if line.startswith(b'{')]
+    try:
+        events = json_loads(b'[' + b','.join(lines) + b']')
+    except ValueError:
+        # A single malformed line breaks the bulk decode, so go line by line
+        events = []
+        for line in lines:
+            try:
+                events.append(json_loads(line))
+            except ValueError:
+                continue
+    
+    for data in events:
+        if data.get('reason') == 'benchmark-complete':
+            bench_id = data['id']
+            # Extract median time in nanoseconds
+            median = data['median']['point_estimate']
+            results[bench_id] = median
     return results
 
+# format_time picks the unit whose index matches the first threshold above the value
+_TIME_THRESHOLDS = (1000, 1_000_000, 1_000_000_000)
+_TIME_UNITS = (
+    (1, ".1f", "ns"),
+    (1000, ".1f", "µs"),
+    (1_000_000, ".1f", "ms"),
+    (1_000_000_000, ".2f", "s"),
+)
+
 def format_time(nanos: float) -> str:
     """Format nanoseconds into human-readable time."""
-    if nanos < 1000:
-        return f"{nanos:.1f}ns"
-    elif nanos < 1_000_000:
-        return f"{nanos/1000:.1f}µs"
-    elif nanos < 1_000_000_000:
-        return f"{nanos/1_000_000:.1f}ms"
-    else:
-        return f"{nanos/1_000_000_000:.2f}s"
+    scale, spec, suffix = _TIME_UNITS[bisect.bisect_right(_TIME_THRESHOLDS, nanos)]
+    return f"{nanos/scale:{spec}}{suffix}"
 
 def calculate_change(old: float, new: float) -> Tuple[float, str]:
     """Calculate percentage change and format it."""
@@ -60,7 +81,7 @@ def generate_markdown_report(base_results: Dict[str, float],
     report.append("| Benchmark | Base | PR | Change |")
     report.append("|-----------|------|----|---------:|")
     
-    all_benchmarks = sorted(set(base_results.keys()) | set(pr_results.keys()))
+    all_benchmarks = sorted(base_results.keys() | pr_results.keys())
     
     regressions = []
     improvements = []
@@ -3,11 +3,37 @@
 Generate a performance dashboard from benchmark results
 """
 
-import json
+import gzip
+import hashlib
+import io
+import math
 import os
-import sys
-from datetime import datetime
+import time
+from dataclasses import dataclass
 from pathlib import Path
+from typing import List
+
+try:
+    import orjson
+    
+    def to_json(value):
+        return orjson.dumps(value).decode()
+except ImportError:
+    from json import dumps as to_json
+
+def to_js_number(value):
+    """Shortest exact JS literal for a float ("2500" rather than "2500.0")"""
+    if not math.isfinite(value):
+        return "null"
+    literal = repr(value)
+    return literal[:-2] if literal.endswith(".0") else literal
+
+def to_js_numbers(values):
+    """Encode floats as a compact JS array literal"""
+    return "[" + ",".join(map(to_js_number, values)) + "]"
+
+# Where the dashboard is written, relative to the working directory
+OUTPUT_PATH = Path("target/performance-dashboard.html")
 
 # HTML template for the dashboard
 DASHBOARD_TEMPLATE = """
@@ -126,89 +152,128 @@ DASHBOARD_TEMPLATE = """
 </html>
 """
 
-def load_benchmark_results():
-    """Load benchmark results from criterion output"""
-    # Mock data - in practice, parse actual criterion JSON output
-    return {
-        "sequential_writes": {
-            "current": 572.98,  # microseconds
-            "baseline": 600.0,
-            "unit": "µs",
-            "samples": 5050
-        },
-        "random_reads": {
-            "current": 125.5,
-            "baseline": 120.0,
-            "unit": "µs",
-            "samples": 8000
-        },
-        "full_scan": {
-            "current": 2500.0,
-            "baseline": 2600.0,
-            "unit": "µs",
-            "samples": 100
-        },
-        "btree_search": {
-            "current": 85.2,
-            "baseline": 90.0,
-            "unit": "ns",
-            "samples": 10000
-        },
-        "page_allocation": {
-            "current": 450.0,
-            "baseline": 440.0,
-            "unit": "ns",
-            "samples": 5000
-        }
-    }
+# Placeholders in DASHBOARD_TEMPLATE, in document order. The template is split
+# around them once at import; its CSS braces make str.format unusable anyway.
+TEMPLATE_FIELDS = ("timestamp", "metrics", "recommendations", "chart_scripts")
 
-def generate_metrics_html(results):
-    """Generate HTML for metric cards"""
-    metrics_html = []
-    
-    for name, data in results.items():
-        current = data["current"]
-        baseline = data["baseline"]
-        change = ((current - baseline) / baseline) * 100
-        
-        change_class = "positive" if change < 0 else "negative"
-        change_symbol = "↓" if change < 0 else "↑"
-        
-        metric_html = f"""
+def split_template(template, fields):
+    """Split a template into the literal segments around each {field}"""
+    parts = []
+    for field in fields:
+        head, template = template.split("{" + field + "}")
+        parts.append(head)
+    parts.append(template)
+    return tuple(parts)
+
+TEMPLATE_PARTS = split_template(DASHBOARD_TEMPLATE, TEMPLATE_FIELDS)
+
+def render_dashboard(values):
+    """Yield the dashboard HTML in chunks, filling the template fields"""
+    yield TEMPLATE_PARTS[0]
+    for field, literal in zip(TEMPLATE_FIELDS, TEMPLATE_PARTS[1:]):
+        yield values[field]
+        yield literal
+
+# Metric card markup, filled from a Row's fields
+METRIC_CARD = """
         <div class="metric-card">
-            <div class="metric-title">{name.replace('_', ' ').title()}</div>
-            <div class="metric-value">{current:.1f} {data['unit']}</div>
+            <div class="metric-title">{title}</div>
+            <div class="metric-value">{current:.1f} {unit}</div>
             <div class="metric-change {change_class}">
-                {change_symbol} {abs(change):.1f}% from baseline
+                {change_symbol} {abs_change:.1f}% from baseline
             </div>
         </div>
         """
-        metrics_html.append(metric_html)
-    
-    return "\n".join(metrics_html)
 
-def generate_chart_scripts(results):
+@dataclass
+class Results:
+    """Benchmark results as parallel columns, one entry per benchmark"""
+    names: List[str]
+    current: List[float]
+    baseline: List[float]
+    units: List[str]
+    samples: List[int]
+
+def load_benchmark_results():
+    """Load benchmark results from criterion output"""
+    # Mock data - in practice, parse actual criterion JSON output
+    return Results(
+        names=["sequential_writes", "random_reads", "full_scan", "btree_search", "page_allocation"],
+        current=[572.98, 125.5, 2500.0, 85.2, 450.0],
+        baseline=[600.0, 120.0, 2600.0, 90.0, 440.0],
+        units=["µs", "µs", "µs", "ns", "ns"],
+        samples=[5050, 8000, 100, 10000, 5000],
+    )
+
+@dataclass
+class Row:
+    """One benchmark with its derived display values"""
+    name: str
+    title: str
+    current: float
+    baseline: float
+    unit: str
+    change: float  # percent change from baseline
+    abs_change: float
+    change_class: str
+    change_symbol: str
+
+def prepare_rows(results):
+    """Compute titles and baseline changes once for all dashboard sections"""
+    rows = []
+    for name, current, baseline, unit in zip(
+        results.names, results.current, results.baseline, results.units
+    ):
+        change = ((current - baseline) / baseline) * 100
+        improved = change < 0
+        rows.append(Row(
+            name=name,
+            title=name.replace('_', ' ').title(),
+            current=current,
+            baseline=baseline,
+            unit=unit,
+            change=change,
+            abs_change=abs(change),
+            change_class="positive" if improved else "negative",
+            change_symbol="↓" if improved else "↑",
+        ))
+    return rows
+
+def generate_metrics_html(rows):
+    """Generate HTML for metric cards"""
+    buf = io.StringIO()
+    write = buf.write
+    for i, row in enumerate(rows):
+        if i:
+            write("\n")
+        write(METRIC_CARD.format_map(vars(row)))
+    return buf.getvalue()
+
+def generate_chart_scripts(rows):
     """Generate Chart.js scripts for visualizations"""
-    # Performance trends chart
-    labels = list(results.keys())
-    current_values = [r["current"] for r in results.values()]
-    baseline_values = [r["baseline"] for r in results.values()]
+    # Data shared by both charts, declared once in the page
+    chart_data = f"""
+    const _labels = {to_json([row.name for row in rows])};
+    const _current = {to_js_numbers([row.current for row in rows])};
+    const _baseline = {to_js_numbers([row.baseline for row in rows])};
+    """
     
+    # Performance trends chart
     performance_chart = f"""
     const perfCtx = document.getElementById('performanceChart').getContext('2d');
     new Chart(perfCtx, {{
         type: 'bar',
         data: {{
-            labels: {json.dumps(labels)},
+            labels: _labels,
             datasets: [{{
                 label: 'Current',
-                data: {json.dumps(current_values)},
+                data: _current,
                 backgroundColor: 'rgba(0, 123, 255, 0.8)',
                 borderColor: 'rgba(0, 123, 255, 1)',
                 borderWidth: 1
             }}, {{
                 label: 'Baseline',
-                data: {json.dumps(baseline_values)},
+                data: _baseline,
                 backgroundColor: 'rgba(108, 117, 125, 0.5)',
                 borderColor: 'rgba(108, 117, 125, 1)',
                 borderWidth: 1
@@ -235,9 +300,9 @@ def generate_chart_scripts(results):
     new Chart(breakdownCtx, {{
         type: 'doughnut',
         data: {{
-            labels: {json.dumps(labels)},
+            labels: _labels,
             datasets: [{{
-                data: {json.dumps(current_values)},
+                data: _current,
                 backgroundColor: [
                     'rgba(255, 99, 132, 0.8)',
                     'rgba(54, 162, 235, 0.8)',
@@ -262,68 +327,137 @@ def generate_chart_scripts(results):
     }});
     """
     
-    return performance_chart + "\n" + breakdown_chart
+    return chart_data + "\n" + performance_chart + "\n" + breakdown_chart
 
-def generate_recommendations(results):
+# Benchmark-specific advice: benchmark -> (threshold on current, message),
+# emitted in this order when the current value exceeds the threshold
+RECOMMENDATION_RULES = {
+    "sequential_writes": (
+        500,
+        "<li><strong>Sequential writes:</strong> Consider implementing bulk insert optimization "
+        "or increasing page size for sequential workloads.</li>"
+    ),
+    "random_reads": (
+        100,
+        "<li><strong>Random reads:</strong> Implement caching for frequently accessed pages "
+        "or add a bloom filter for non-existent keys.</li>"
+    ),
+    "page_allocation": (
+        400,
+        "<li><strong>Page allocation:</strong> Implement a freelist cache "
+        "or batch page allocations to reduce overhead.</li>"
+    ),
+}
+
+def generate_recommendations(rows):
     """Generate performance recommendations based on results"""
-    recommendations = []
+    buf = io.StringIO()
+    
+    def add(recommendation):
+        if buf.tell():
+            buf.write("\n")
+        buf.write(recommendation)
+    
+    triggered = set()
     
-    # Check for regressions
-    for name, data in results.items():
-        change = ((data["current"] - data["baseline"]) / data["baseline"]) * 100
-        if change > 10:
-            recommendations.append(
-                f"<li><strong>{name}:</strong> {change:.1f}% regression detected. "
+    # Check for regressions and benchmark-specific thresholds in one pass
+    for row in rows:
+        if row.change > 10:
+            add(
+                f"<li><strong>{row.name}:</strong> {row.change:.1f}% regression detected. "
                 f"Consider profiling this operation specifically.</li>"
             )
+        rule = RECOMMENDATION_RULES.get(row.name)
+        if rule and row.current > rule[0]:
+            triggered.add(row.name)
     
     # General recommendations based on patterns
-    if results.get("sequential_writes", {}).get("current", 0) > 500:
-        recommendations.append(
-            "<li><strong>Sequential writes:</strong> Consider implementing bulk insert optimization "
-            "or increasing page size for sequential workloads.</li>"
-        )
-    
-    if results.get("random_reads", {}).get("current", 0) > 100:
-        recommendations.append(
-            "<li><strong>Random reads:</strong> Implement caching for frequently accessed pages "
-            "or add a bloom filter for non-existent keys.</li>"
-        )
-    
-    if results.get("page_allocation", {}).get("current", 0) > 400:
-        recommendations.append(
-            "<li><strong>Page allocation:</strong> Implement a freelist cache "
-            "or batch page allocations to reduce overhead.</li>"
-        )
+    for name, (_, message) in RECOMMENDATION_RULES.items():
+        if name in triggered:
+            add(message)
     
-    if not recommendations:
-        recommendations.append("<li>All operations are performing within expected bounds.</li>")
+    if not buf.tell():
+        add("<li>All operations are performing within expected bounds.</li>")
     
-    return "\n".join(recommendations)
+    return buf.getvalue()
+
+# First line of every generated dashboard, recording the digest of its content
+DIGEST_LINE = "<!-- dash-hash: {} -->\n"
+
+def dashboard_digest(fragments):
+    """Hash everything that determines the dashboard except its timestamp"""
+    h = hashlib.blake2b(digest_size=16)
+    for part in (*TEMPLATE_PARTS, *fragments):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+def read_digest(path):
+    """Return the digest recorded in a previously generated dashboard, if any"""
+    try:
+        with path.open(encoding="utf-8") as f:
+            first_line = f.readline()
+    except (OSError, UnicodeDecodeError):
+        return None
+    prefix, _, suffix = DIGEST_LINE.partition("{}")
+    if first_line.startswith(prefix) and first_line.endswith(suffix):
+        return first_line[len(prefix):-len(suffix)]
+    return None
 
 def main():
     """Generate the performance dashboard"""
-    results = load_benchmark_results()
+    rows = prepare_rows(load_benchmark_results())
     
     # Generate HTML components
-    metrics_html = generate_metrics_html(results)
-    chart_scripts = generate_chart_scripts(results)
-    recommendations = generate_recommendations(results)
+    metrics_html = generate_metrics_html(rows)
+    chart_scripts = generate_chart_scripts(rows)
+    recommendations = generate_recommendations(rows)
     
-    # Fill in the template
-    dashboard_html = DASHBOARD_TEMPLATE.format(
-        timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        metrics=metrics_html,
-        chart_scripts=chart_scripts,
-        recommendations=recommendations
-    )
+    output_path = OUTPUT_PATH
+    gzip_path = output_path.with_suffix(".html.gz")
+    
+    # Leave the existing dashboard alone if it was built from the same content
+    digest = dashboard_digest((metrics_html, chart_scripts, recommendations))
+    if gzip_path.exists() and read_digest(output_path) == digest:
+        print(f"Performance dashboard up to date: {output_path}")
+        return
     
-    # Write to file
-    output_path = Path("target/performance-dashboard.html")
-    output_path.parent.mkdir(exist_ok=True)
-    output_path.write_text(dashboard_html)
+    # Fill in the template, streaming each chunk to the HTML file and to a
+    # gzipped copy that static hosts can serve with Content-Encoding: gzip.
+    # Both are written to temporary files first, so an interrupted run never
+    # leaves a truncated page behind a valid digest.
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    tmp_gzip_path = gzip_path.with_name(gzip_path.name + ".tmp")
+    try:
+        # The gzip header records output_path's name rather than the .tmp file's,
+        # and a zero mtime keeps the archive identical for identical content
+        with tmp_path.open("w", encoding="utf-8", buffering=1 << 20) as f, \
+                tmp_gzip_path.open("wb") as raw, \
+                gzip.GzipFile(filename=output_path.name, mode="wb", fileobj=raw,
+                              compresslevel=6, mtime=0) as gz_raw, \
+                io.TextIOWrapper(gz_raw, encoding="utf-8") as gz:
+            header = DIGEST_LINE.format(digest)
+            f.write(header)
+            gz.write(header)
+            for chunk in render_dashboard({
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "metrics": metrics_html,
+                "chart_scripts": chart_scripts,
+                "recommendations": recommendations
+            }):
+                f.write(chunk)
+                gz.write(chunk)
+        # The HTML carries the digest, so it goes last: a digest on disk
+        # always means both files are complete
+        os.replace(tmp_gzip_path, gzip_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        for path in (tmp_path, tmp_gzip_path):
+            path.unlink(missing_ok=True)
     
     print(f"Performance dashboard generated: {output_path}")
+    print(f"Pre-compressed copy: {gzip_path}")
     print("Open in a web browser to view the results.")
 
 if __name__ == "__main__":
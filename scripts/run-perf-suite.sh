@@ -136,8 +136,8 @@ EOF
 
 # 8. Generate HTML dashboard
 echo -e "\n8. Generating performance dashboard..."
-cd scripts && python3 generate-perf-dashboard.py
-mv ../target/performance-dashboard.html "$REPORT_DIR/"
+python3 scripts/generate-perf-dashboard.py
+mv target/performance-dashboard.html target/performance-dashboard.html.gz "$REPORT_DIR/"
 
 # 9. Create summary
 echo -e "\n9. Creating performance summary..."